@@ -79,8 +79,17 @@
 #                out of that. To do so, you have to use SfM_georef (http://tinyurl.com/sfmgeoref). Please, read
 #                the user guide of SfM_georef (Section 10, from p. 14) to properly perform the precision analysis.
 #
+# Sweep mode:  To compare several accuracy settings and/or camera parameter sets, set 'run_sweep' to True and list
+#              the configurations in 'sweep_configs' (SETUP section). The initial bundle adjustment, the offset, the
+#              observation distances, the zero-error reference and 'sparse_pts_reference.ply' are then computed only
+#              once, and the iterations of each configuration are run from this same reference state. A comparison
+#              table of the precisions and runtimes is written to 'Monte_Carlo_output/_sweep_comparison.txt'.
+#
 # UPDATE LOG:
 #============
+# 19/10/26 Added a sweep mode to run several accuracy / camera model configurations from a single shared setup
+#          Added the optional export of per-point precisions ('_point_precision.txt') computed from the iterations
+#          Added the export of the coordinate system in WKT format ('_coordinate_system.wkt') for the precision maps
 # 18/04/24 Update of the header to make it more user friendly
 # 15/06/23 Replaced "point_cloud" class by "tie_points", according to the new namings of version 2
 #          Replaced "exportPoints" by "exportPointCloud"
@@ -109,6 +118,7 @@ import random
 import math
 import csv
 import os
+import time
 NaN = float('NaN')
 
 ########################################################################################
@@ -153,12 +163,59 @@ optimise_p4=False
 # e.g.  pts_offset = Metashape.Vector( [266000, 4702000, 0] )
 pts_offset = Metashape.Vector( [NaN, NaN, NaN] )
 
+# Sweep mode. Set run_sweep to True to run num_randomisations iterations for each configuration listed in
+# sweep_configs, while computing the initial bundle adjustment, offset, observation distances, zero-error reference
+# and 'sparse_pts_reference.ply' only once. The results of each configuration are stored in a sub-folder
+# (e.g. 'Monte_Carlo_output/sweep_01/') and compared in 'Monte_Carlo_output/_sweep_comparison.txt'.
+# Available keys for each configuration (keys that are not given keep the chunk settings, or the optimise_* values above):
+#     'tiepoint_accuracy'           ---> tie point accuracy (in pixels)
+#     'marker_projection_accuracy'  ---> marker projection accuracy (in pixels)
+#     'marker_location_accuracy'    ---> marker location accuracy [X, Y, Z] (in metres)
+#     'camera_location_accuracy'    ---> camera location accuracy [X, Y, Z] (in metres)
+#     'optimise'                    ---> camera parameters to change, e.g. {'k3': False, 'b1': False}
+# Note that accuracies set individually for markers or cameras in the Reference pane still take precedence.
+# Each configuration runs on a temporary copy of the chunk holding only the cameras, markers, scalebars and tie points
+# (no key points, dense cloud, model, DEM or orthomosaic).
+run_sweep = False
+sweep_configs = [
+	{'tiepoint_accuracy': 0.5, 'marker_projection_accuracy': 0.5},
+	{'tiepoint_accuracy': 1.0, 'marker_projection_accuracy': 1.0},
+	{'tiepoint_accuracy': 1.0, 'marker_projection_accuracy': 1.0, 'marker_location_accuracy': [0.02, 0.02, 0.05], 'optimise': {'b1': False, 'b2': False}},
+]
+
+# Compute the precision (standard deviation) of each tie point coordinate from the iterations, and save it as a text
+# file ('_point_precision.txt') next to the iteration results. One row per tie point, with six tab-separated columns:
+# X  Y  Z  sigmaX  sigmaY  sigmaZ  (coordinates in the chunk coordinate system, minus the offset defined above).
+# This adds a loop over all tie points to each iteration, which can considerably increase the total processing time
+# of large projects. It is required to fill the precision columns of the sweep comparison table, and is therefore
+# enabled by default in sweep mode only. Set it to True to also compute the point precisions of a single run
+# (e.g. for AMP210_precision_maps.py). It does not replace the full analysis in SfM_georef.
+compute_point_precision = run_sweep
+
 ###################################   END OF SETUP   ###################################
 ########################################################################################
 
 # Initialisation
 chunk = Metashape.app.document.chunk
-point_proj = chunk.tie_points.projections
+setup_start = time.time()
+
+# Camera parameter set of the SETUP section, used for the initial bundle adjustment and as default for the sweep
+optimise_flags = {'f': optimise_f, 'cx': optimise_cx, 'cy': optimise_cy, 'b1': optimise_b1, 'b2': optimise_b2,
+	'k1': optimise_k1, 'k2': optimise_k2, 'k3': optimise_k3, 'k4': optimise_k4,
+	'p1': optimise_p1, 'p2': optimise_p2, 'p3': optimise_p3, 'p4': optimise_p4}
+
+# Check the sweep configurations before starting the (long) shared setup
+sweep_keys = ['tiepoint_accuracy', 'marker_projection_accuracy', 'marker_location_accuracy', 'camera_location_accuracy', 'optimise']
+if run_sweep:
+	if not sweep_configs:
+		raise ValueError('run_sweep is True, but sweep_configs is empty')
+	for configIDx, config in enumerate(sweep_configs):
+		for key in config:
+			if key not in sweep_keys:
+				raise ValueError('Unknown key in sweep configuration ' + str(configIDx+1) + ': ' + key)
+		for param in config.get('optimise', {}):
+			if param not in optimise_flags:
+				raise ValueError('Unknown camera parameter in sweep configuration ' + str(configIDx+1) + ': ' + param)
 
 
 # Need CoordinateSystem object, but PS only returns 'None' if an arbitrary coordinate system is being used
@@ -189,9 +246,6 @@ for cam in chunk.cameras:
 	act_cam_orient_flags.append(cam.reference.enabled)
 num_act_cam_orients = sum(act_cam_orient_flags)
 
-# Reset the random seed, so that all equivalent runs of this script are started identically
-random.seed(1)
-
 # Carry out an initial bundle adjustment to ensure that everything subsequent has a consistent reference starting point.
 chunk.optimizeCameras(fit_f=optimise_f, fit_cx=optimise_cx, fit_cy=optimise_cy, fit_b1=optimise_b1, fit_b2=optimise_b2, fit_k1=optimise_k1, fit_k2=optimise_k2, fit_k3=optimise_k3, fit_k4=optimise_k4, fit_p1=optimise_p1, fit_p2=optimise_p2, fit_p3=optimise_p3, fit_p4=optimise_p4)
 
@@ -256,6 +310,11 @@ with open(dir_path + '_coordinate_system.txt', "w") as f:
 	fwriter = csv.writer(f, dialect='excel-tab', lineterminator='\n')
 	fwriter.writerow( [crs] )
 	f.close()
+
+# Export the coordinate system in WKT format, used as projection of the precision maps (AMP210_precision_maps.py)
+with open(dir_path + '_coordinate_system.wkt', "w") as f:
+	f.write(crs.wkt)
+	f.close()
 	
 # Make a copy of the chunk to use as a zero-error reference chunk
 original_chunk = chunk.copy()
@@ -293,12 +352,6 @@ for camera in original_chunk.cameras:
 # Export this 'zero error' marker data to file
 original_chunk.exportMarkers(dir_path + 'referenceMarkers.xml')
 
-# Derive x and y components for image measurement precisions
-tie_proj_x_stdev = chunk.tiepoint_accuracy / math.sqrt(2)
-tie_proj_y_stdev = chunk.tiepoint_accuracy / math.sqrt(2)
-marker_proj_x_stdev = chunk.marker_projection_accuracy / math.sqrt(2)
-marker_proj_y_stdev = chunk.marker_projection_accuracy / math.sqrt(2)
-
 # Carry out an adjustment with a fixed camera to define a benchmark set of sparse points for later comparison.
 # Ideally, this should be the same as the sparse points in the zero-error chunk, but there do seem to be some differences.
 # Make a copy of the zero-error reference chunk to run the adjustment on
@@ -313,99 +366,209 @@ temp_chunk.exportPointCloud(dir_path + 'sparse_pts_reference.ply', source_data=M
 # Delete this chunk
 Metashape.app.document.remove([temp_chunk])
 
-# Counter for the number of bundle adjustments carried out, to prepend to files
-file_idx = 1  	
 Metashape.app.document.chunk = chunk
 
 # Make the ouput directory if it doesn't exist
 dir_path = dir_path + 'Monte_Carlo_output/'
 os.makedirs(dir_path, exist_ok=True)
 
+setup_time = time.time() - setup_start
+print('Shared setup completed in ' + '{0:.1f}'.format(setup_time) + ' s')
+
 ########################################################################################
-# Main set of nested loops which control the repeated bundle adjustment
-for line_ID in range(0, num_randomisations ):
-	# Reset the camera coordinates if they are used for georeferencing
-	if num_act_cam_orients > 0:
-		for camIDx, cam in enumerate(chunk.cameras):
-			if not cam.reference.accuracy:
-				cam.reference.location = ( original_chunk.cameras[camIDx].reference.location +
-				Metashape.Vector( [random.gauss(0, chunk.camera_location_accuracy[0]), random.gauss(0, chunk.camera_location_accuracy[1]), random.gauss(0, chunk.camera_location_accuracy[2])] ) )
-			else:
-				cam.reference.location = ( original_chunk.cameras[camIDx].reference.location +
-				Metashape.Vector( [random.gauss(0, cam.reference.accuracy[0]), random.gauss(0, cam.reference.accuracy[1]), random.gauss(0, cam.reference.accuracy[2])] ) )
-
-	# Reset the marker coordinates and add noise
-	for markerIDx, marker in enumerate(chunk.markers):
-		if not marker.reference.accuracy:
-			marker.reference.location = ( original_chunk.markers[markerIDx].reference.location +
-			Metashape.Vector( [random.gauss(0, chunk.marker_location_accuracy[0]), random.gauss(0, chunk.marker_location_accuracy[1]), random.gauss(0, chunk.marker_location_accuracy[2])] ) )
-		else:
-			marker.reference.location = ( original_chunk.markers[markerIDx].reference.location +
-			Metashape.Vector( [random.gauss(0, marker.reference.accuracy[0]), random.gauss(0, marker.reference.accuracy[1]), random.gauss(0, marker.reference.accuracy[2])] ) )
-
-	# Reset the scalebar lengths and add noise
-	for scalebarIDx, scalebar in enumerate(chunk.scalebars):
-		if scalebar.reference.distance:
-			if not scalebar.reference.accuracy:
-				scalebar.reference.distance = ( original_chunk.scalebars[scalebarIDx].reference.distance +
-				random.gauss(0, chunk.scalebar_accuracy) )
-			else:
-				scalebar.reference.distance = ( original_chunk.scalebars[scalebarIDx].reference.distance +
-				random.gauss(0, scalebar.reference.accuracy) )
-				
-	# Reset the observations (projections) and add Gaussian noise
-	for photoIDx, camera in enumerate(chunk.cameras):
-		original_camera = original_chunk.cameras[photoIDx]	
-		if not camera.transform:
-			continue
-		
-		# Tie points (matches)
-		matches = point_proj[camera]
-		original_matches = original_point_proj[original_camera]
-		for matchIDx in range(0, len(matches)):	
-			matches[matchIDx].coord = ( original_matches[matchIDx].coord + 
-			Metashape.Vector( [random.gauss(0, tie_proj_x_stdev), random.gauss(0, tie_proj_y_stdev)] ) )
-            
-      # Markers
+# Repeated bundle adjustments of one configuration, starting from the zero-error reference chunk.
+# Returns the runtime (s) and the mean tie point precisions [sigmaX, sigmaY, sigmaZ, sigmaXY, number of points].
+def run_randomisations(chunk, out_path, fit):
+	point_proj = chunk.tie_points.projections
+
+	# Derive x and y components for image measurement precisions
+	tie_proj_x_stdev = chunk.tiepoint_accuracy / math.sqrt(2)
+	tie_proj_y_stdev = chunk.tiepoint_accuracy / math.sqrt(2)
+	marker_proj_x_stdev = chunk.marker_projection_accuracy / math.sqrt(2)
+	marker_proj_y_stdev = chunk.marker_projection_accuracy / math.sqrt(2)
+
+	# Running mean and sum of squared deviations (Welford) of each tie point coordinate, for the point precisions
+	npoints = len(chunk.tie_points.points)
+	pts_count = [0] * npoints
+	pts_mean = [[0.0] * npoints for dim in range(3)]
+	pts_m2 = [[0.0] * npoints for dim in range(3)]
+
+	# Reset the random seed, so that all configurations use the same sequence of pseudo-random offsets
+	random.seed(1)
+	
+	# Counter for the number of bundle adjustments carried out, to prepend to files
+	file_idx = 1
+	batch_start = time.time()
+
+	# Main set of nested loops which control the repeated bundle adjustment
+	for line_ID in range(0, num_randomisations ):
+		# Reset the camera coordinates if they are used for georeferencing
+		if num_act_cam_orients > 0:
+			for camIDx, cam in enumerate(chunk.cameras):
+				if not cam.reference.accuracy:
+					cam.reference.location = ( original_chunk.cameras[camIDx].reference.location +
+					Metashape.Vector( [random.gauss(0, chunk.camera_location_accuracy[0]), random.gauss(0, chunk.camera_location_accuracy[1]), random.gauss(0, chunk.camera_location_accuracy[2])] ) )
+				else:
+					cam.reference.location = ( original_chunk.cameras[camIDx].reference.location +
+					Metashape.Vector( [random.gauss(0, cam.reference.accuracy[0]), random.gauss(0, cam.reference.accuracy[1]), random.gauss(0, cam.reference.accuracy[2])] ) )
+
+		# Reset the marker coordinates and add noise
 		for markerIDx, marker in enumerate(chunk.markers):
-			if not marker.projections[camera]:
+			if not marker.reference.accuracy:
+				marker.reference.location = ( original_chunk.markers[markerIDx].reference.location +
+				Metashape.Vector( [random.gauss(0, chunk.marker_location_accuracy[0]), random.gauss(0, chunk.marker_location_accuracy[1]), random.gauss(0, chunk.marker_location_accuracy[2])] ) )
+			else:
+				marker.reference.location = ( original_chunk.markers[markerIDx].reference.location +
+				Metashape.Vector( [random.gauss(0, marker.reference.accuracy[0]), random.gauss(0, marker.reference.accuracy[1]), random.gauss(0, marker.reference.accuracy[2])] ) )
+
+		# Reset the scalebar lengths and add noise
+		for scalebarIDx, scalebar in enumerate(chunk.scalebars):
+			if scalebar.reference.distance:
+				if not scalebar.reference.accuracy:
+					scalebar.reference.distance = ( original_chunk.scalebars[scalebarIDx].reference.distance +
+					random.gauss(0, chunk.scalebar_accuracy) )
+				else:
+					scalebar.reference.distance = ( original_chunk.scalebars[scalebarIDx].reference.distance +
+					random.gauss(0, scalebar.reference.accuracy) )
+					
+		# Reset the observations (projections) and add Gaussian noise
+		for photoIDx, camera in enumerate(chunk.cameras):
+			original_camera = original_chunk.cameras[photoIDx]	
+			if not camera.transform:
 				continue
-			print('Added noise dimensions: ' + str(Metashape.Vector([random.gauss(0, marker_proj_x_stdev), random.gauss(0, marker_proj_y_stdev)]).size), 'Marker projection coordinates dimensions: ' + str(original_chunk.markers[markerIDx].projections[original_camera].coord[0:2].size))
-			marker.projections[camera].coord = ( original_chunk.markers[markerIDx].projections[original_camera].coord[0:2] +	Metashape.Vector([random.gauss(0, marker_proj_x_stdev), random.gauss(0, marker_proj_y_stdev)]) )    
-	
-    
-	# Construct the output file names
-	out_file = ('{0:04d}'.format(file_idx) + '_MA' + '{0:0.5f}'.format(chunk.marker_location_accuracy[0]) + 
-	'_PA' + '{0:0.5f}'.format(chunk.marker_projection_accuracy) + '_TA' + '{0:0.5f}'.format(chunk.tiepoint_accuracy)+ 
-	'_NAM' + '{0:03d}'.format(num_act_markers) + '_LID' + '{0:03d}'.format(line_ID+1) )
-	out_gc_file = out_file + '_GC.txt'
-	out_cams_c_file = out_file + '_cams_c.txt'
-	out_cam_file = out_file + '_cams.xml'
-	print( out_gc_file )
-	
-	# Bundle adjustment
-	chunk.optimizeCameras(fit_f=optimise_f, fit_cx=optimise_cx, fit_cy=optimise_cy, fit_b1=optimise_b1, fit_b2=optimise_b2, fit_k1=optimise_k1, fit_k2=optimise_k2, fit_k3=optimise_k3, fit_k4=optimise_k4, fit_p1=optimise_p1, fit_p2=optimise_p2, fit_p3=optimise_p3, fit_p4=optimise_p4)
-
-	# Export the control (catch and deal with legacy syntax)
-	try:
-		chunk.exportReference(dir_path + out_gc_file, Metashape.ReferenceFormatCSV, items=Metashape.ReferenceItemsMarkers,)
-		chunk.exportReference(dir_path + out_cams_c_file, Metashape.ReferenceFormatCSV, items=Metashape.ReferenceItemsCameras)
-	except:
-		chunk.exportReference(dir_path + out_gc_file, 'csv')
+			
+			# Tie points (matches)
+			matches = point_proj[camera]
+			original_matches = original_point_proj[original_camera]
+			for matchIDx in range(0, len(matches)):	
+				matches[matchIDx].coord = ( original_matches[matchIDx].coord + 
+				Metashape.Vector( [random.gauss(0, tie_proj_x_stdev), random.gauss(0, tie_proj_y_stdev)] ) )
+	            
+			# Markers
+			for markerIDx, marker in enumerate(chunk.markers):
+				if not marker.projections[camera]:
+					continue
+				print('Added noise dimensions: ' + str(Metashape.Vector([random.gauss(0, marker_proj_x_stdev), random.gauss(0, marker_proj_y_stdev)]).size), 'Marker projection coordinates dimensions: ' + str(original_chunk.markers[markerIDx].projections[original_camera].coord[0:2].size))
+				marker.projections[camera].coord = ( original_chunk.markers[markerIDx].projections[original_camera].coord[0:2] +	Metashape.Vector([random.gauss(0, marker_proj_x_stdev), random.gauss(0, marker_proj_y_stdev)]) )    
 		
-	# Export the cameras
-	chunk.exportCameras(dir_path + out_cam_file, format=Metashape.CamerasFormatXML, crs=crs, chan_rotation_order=Metashape.RotationOrderXYZ)
-	
-	# Export the calibrations [NOTE - only one camera implemented in export here]
-	for sensorIDx, sensor in enumerate(chunk.sensors):
-		sensor.calibration.save(dir_path + out_file + '_cal' + '{0:01d}'.format(sensorIDx+1) + '.xml')
+	    
+		# Construct the output file names
+		out_file = ('{0:04d}'.format(file_idx) + '_MA' + '{0:0.5f}'.format(chunk.marker_location_accuracy[0]) + 
+		'_PA' + '{0:0.5f}'.format(chunk.marker_projection_accuracy) + '_TA' + '{0:0.5f}'.format(chunk.tiepoint_accuracy)+ 
+		'_NAM' + '{0:03d}'.format(num_act_markers) + '_LID' + '{0:03d}'.format(line_ID+1) )
+		out_gc_file = out_file + '_GC.txt'
+		out_cams_c_file = out_file + '_cams_c.txt'
+		out_cam_file = out_file + '_cams.xml'
+		print( out_gc_file )
+		
+		# Bundle adjustment
+		chunk.optimizeCameras(fit_f=fit['f'], fit_cx=fit['cx'], fit_cy=fit['cy'], fit_b1=fit['b1'], fit_b2=fit['b2'], fit_k1=fit['k1'], fit_k2=fit['k2'], fit_k3=fit['k3'], fit_k4=fit['k4'], fit_p1=fit['p1'], fit_p2=fit['p2'], fit_p3=fit['p3'], fit_p4=fit['p4'])
 
-	
-	# Export the sparse point cloud
-	chunk.exportPointCloud(dir_path + out_file + '_pts.ply', source_data=Metashape.TiePointsData, save_point_normal=False, save_point_color=False, format=Metashape.PointCloudFormatPLY, crs=crs, shift=pts_offset)			
-	
-	# Increment the file counter
-	file_idx = file_idx+1
+		# Export the control (catch and deal with legacy syntax)
+		try:
+			chunk.exportReference(out_path + out_gc_file, Metashape.ReferenceFormatCSV, items=Metashape.ReferenceItemsMarkers,)
+			chunk.exportReference(out_path + out_cams_c_file, Metashape.ReferenceFormatCSV, items=Metashape.ReferenceItemsCameras)
+		except:
+			chunk.exportReference(out_path + out_gc_file, 'csv')
+			
+		# Export the cameras
+		chunk.exportCameras(out_path + out_cam_file, format=Metashape.CamerasFormatXML, crs=crs, chan_rotation_order=Metashape.RotationOrderXYZ)
+		
+		# Export the calibrations [NOTE - only one camera implemented in export here]
+		for sensorIDx, sensor in enumerate(chunk.sensors):
+			sensor.calibration.save(out_path + out_file + '_cal' + '{0:01d}'.format(sensorIDx+1) + '.xml')
+
+		
+		# Export the sparse point cloud
+		chunk.exportPointCloud(out_path + out_file + '_pts.ply', source_data=Metashape.TiePointsData, save_point_normal=False, save_point_color=False, format=Metashape.PointCloudFormatPLY, crs=crs, shift=pts_offset)			
+		
+		# Update the running statistics of the tie point coordinates (same coordinates as in the exported ply)
+		if compute_point_precision:
+			T = chunk.transform.matrix
+			for pointIDx, point in enumerate(chunk.tie_points.points):
+				if not point.valid:
+					continue
+				coord = crs.project(T.mulp(Metashape.Vector( [point.coord[0], point.coord[1], point.coord[2]] ))) - pts_offset
+				pts_count[pointIDx] += 1
+				for dim in range(3):
+					delta = coord[dim] - pts_mean[dim][pointIDx]
+					pts_mean[dim][pointIDx] += delta / pts_count[pointIDx]
+					pts_m2[dim][pointIDx] += delta * (coord[dim] - pts_mean[dim][pointIDx])
+
+		# Increment the file counter
+		file_idx = file_idx+1
+
+	batch_time = time.time() - batch_start
+
+	# Export the per-point precisions and compute their mean
+	sigma_sums = [0.0, 0.0, 0.0, 0.0]
+	nvalid = 0
+	if compute_point_precision:
+		with open(out_path + '_point_precision.txt', "w") as f:
+			fwriter = csv.writer(f, dialect='excel-tab', lineterminator='\n')
+			for pointIDx in range(0, npoints):
+				if pts_count[pointIDx] < 2:
+					continue
+				sigma = [math.sqrt(pts_m2[dim][pointIDx] / (pts_count[pointIDx] - 1)) for dim in range(3)]
+				fwriter.writerow( ['{0:.4f}'.format(pts_mean[dim][pointIDx]) for dim in range(3)] + ['{0:.6f}'.format(sigma[dim]) for dim in range(3)] )
+				for dim in range(3):
+					sigma_sums[dim] += sigma[dim]
+				sigma_sums[3] += math.sqrt(sigma[0]**2 + sigma[1]**2)
+				nvalid += 1
+			f.close()
+
+	if nvalid > 0:
+		mean_sigmas = [sigma_sums[dim] / nvalid for dim in range(4)] + [nvalid]
+	else:
+		mean_sigmas = [NaN, NaN, NaN, NaN, 0]
+	return batch_time, mean_sigmas
+
+########################################################################################
+if not run_sweep:
+	# Single configuration, using the chunk settings and the SETUP section
+	run_randomisations(chunk, dir_path, optimise_flags)
+
+else:
+	# Run each configuration of the sweep on a copy of the chunk, all starting from the same reference state
+	with open(dir_path + '_sweep_comparison.txt', "w") as f:
+		fwriter = csv.writer(f, dialect='excel-tab', lineterminator='\n')
+		fwriter.writerow( ['Config', 'Folder', 'TA', 'PA', 'MA_X', 'MA_Y', 'MA_Z', 'CA_X', 'CA_Y', 'CA_Z', 'Fitted_parameters',
+			'Iterations', 'Setup_runtime_s', 'Copy_runtime_s', 'Runtime_s', 'Runtime_per_iteration_s', 'Points', 'Mean_sigmaX', 'Mean_sigmaY', 'Mean_sigmaZ', 'Mean_sigmaXY'] )
+		
+		for configIDx, config in enumerate(sweep_configs):
+			sweep_dir = 'sweep_' + '{0:02d}'.format(configIDx+1) + '/'
+			os.makedirs(dir_path + sweep_dir, exist_ok=True)
+			
+			# Copy only the data needed by the bundle adjustment (cameras, markers and scalebars are always copied)
+			copy_start = time.time()
+			sweep_chunk = chunk.copy(items=[Metashape.DataSource.TiePointsData], keypoints=False)
+			copy_time = time.time() - copy_start
+			sweep_chunk.label = chunk.label + ' (sweep ' + '{0:02d}'.format(configIDx+1) + ')'
+			if 'tiepoint_accuracy' in config:
+				sweep_chunk.tiepoint_accuracy = config['tiepoint_accuracy']
+			if 'marker_projection_accuracy' in config:
+				sweep_chunk.marker_projection_accuracy = config['marker_projection_accuracy']
+			if 'marker_location_accuracy' in config:
+				sweep_chunk.marker_location_accuracy = Metashape.Vector(config['marker_location_accuracy'])
+			if 'camera_location_accuracy' in config:
+				sweep_chunk.camera_location_accuracy = Metashape.Vector(config['camera_location_accuracy'])
+			fit = dict(optimise_flags)
+			fit.update(config.get('optimise', {}))
+			
+			print('Sweep configuration ' + str(configIDx+1) + '/' + str(len(sweep_configs)) + ': ' + str(config))
+			batch_time, mean_sigmas = run_randomisations(sweep_chunk, dir_path + sweep_dir, fit)
+			
+			fwriter.writerow( [configIDx+1, sweep_dir, '{0:0.5f}'.format(sweep_chunk.tiepoint_accuracy), '{0:0.5f}'.format(sweep_chunk.marker_projection_accuracy)] +
+				['{0:0.5f}'.format(val) for val in sweep_chunk.marker_location_accuracy] + ['{0:0.5f}'.format(val) for val in sweep_chunk.camera_location_accuracy] +
+				[','.join([param for param in fit if fit[param]]), num_randomisations, '{0:.1f}'.format(setup_time), '{0:.1f}'.format(copy_time),
+				'{0:.1f}'.format(batch_time), '{0:.2f}'.format(batch_time/num_randomisations), mean_sigmas[4]] +
+				['{0:.6f}'.format(val) for val in mean_sigmas[0:4]] )
+			f.flush()
+			
+			Metashape.app.document.remove([sweep_chunk])
+			Metashape.app.document.chunk = chunk
+		
+		f.close()
 
 # Metashape.app.document.remove([original_chunk])
 
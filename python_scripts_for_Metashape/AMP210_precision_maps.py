@@ -0,0 +1,387 @@
+#-----------------------------------------------------------------------------------------------------------------
+# Name:         AMP210_precision_maps.py
+# Purpose:      Rasterize the per-point precisions obtained with the Monte Carlo approach
+#               (AMP210_precision_estimates.py) into gridded precision maps (sigma Z and sigma XY).
+#
+# Compatibility: Agisoft Metashape Pro 2.0.x to 2.1.x (Python console), or any Python 3 interpreter with numpy
+#
+# Version 210 (Compatible with AMP 2.1.0) – 19 October 2026
+#
+# Author:
+#     Benoît Smets
+#     Royal Museum for Central Africa / Vrije Unversiteit Brussel (Belgium)
+#
+# Important Note:   Please follow the instructions here below!
+#-----------------------------------------------------------------------------------------------------------------
+
+# DESCRIPTION OF THE SCRIPT:
+# ==========================
+#
+# This script bins per-point precision estimates on a regular grid, in the coordinate system of the chunk, in order
+# to produce precision maps that can be aligned with the DEMs of the project. For each grid cell, the mean sigma Z and
+# the mean sigma XY (i.e. sqrt(sigmaX^2 + sigmaY^2)) of the points falling in the cell are computed, together with
+# the number of points. Empty cells can optionally be filled by inverse distance weighting (IDW) of the surrounding
+# cells.
+#
+# The input is a text file with one row per point. By default, the script reads the '_point_precision.txt' file written
+# by AMP210_precision_estimates.py (X Y Z sigmaX sigmaY sigmaZ, with the local origin subtracted), but the columns can
+# be adapted to read the point precisions exported from SfM_georef. The local origin ('_coordinate_local_origin.txt')
+# and the coordinate system ('_coordinate_system.wkt') written by AMP210_precision_estimates.py are used to
+# georeference the output.
+#
+# The grid is processed by tiles: the points are first distributed into temporary tile files, then each tile is
+# aggregated, gap-filled and written to the output rasters. The aggregation and the gap filling are vectorised with
+# numpy, and only the tiles containing points (or located next to them, when filling gaps) are processed.
+# Rows with non-finite coordinates or precisions (e.g. NaN in SfM_georef exports) are skipped and counted.
+# The temporary files are stored in the data directory and removed at the end of the processing, also on error.
+#
+# The precision maps are written as tiled and compressed GeoTIFF files if GDAL (osgeo) is available. Each tile is
+# written directly at its position in the rasters, and the memory used depends on tile_size and buffer_points, but not
+# on the number of points or on the size of the grid. Without GDAL, the maps are written as ESRI ASCII grids (.asc
+# with .prj), readable by any GIS software. This fallback is only suited to moderate grid sizes: it keeps one full
+# raster row in memory, writes a temporary file of 12 x tile_size x ncols bytes per row of tiles, and produces
+# text files of about 10 bytes per cell.
+#
+# The main limitation in time is the reading of the text file of points (in the order of a few million points per
+# minute) and, with GDAL, the compression of the GeoTIFF files.
+#
+# INSTRUCTIONS TO USE THE SCRIPT:
+# ===============================
+#
+# Requirements:   - The precision estimates must have been computed (AMP210_precision_estimates.py with
+#                   compute_point_precision = True, or SfM_georef)
+#                 - numpy (included in Metashape Pro); GDAL (osgeo) is optional, for the GeoTIFF output
+#                 - The coordinate system of the chunk must be a projected or local coordinate system
+#
+# Usage:      1) Open the script in a text editor and modify the hard-coded SETUP section (data directory, cell size,
+#                grid origin, gap filling, output format).
+#             2) Run the script. In Metashape, go to the main menu bar and select "Tools > Run Script...". Outside
+#                Metashape, run "python AMP210_precision_maps.py" in a terminal.
+#-----------------------------------------------------------------------------------------------------------------
+
+import csv
+import itertools
+import math
+import os
+import shutil
+import tempfile
+import numpy as np
+try:
+	from osgeo import gdal
+except ImportError:
+	gdal = None
+NaN = float('NaN')
+
+########################################################################################
+######################################   SETUP    ######################################
+########################################################################################
+# Update the parameters below to tailor the script to your project.
+
+# Directory where the precision estimate results are stored (the 'dir_path' of AMP210_precision_estimates.py).
+# Note use of '/' in the path (not '\'); end the path with '/'
+dir_path = 'E:/PrecisionEstimates/'
+
+# File with the per-point precisions (path relative to dir_path). For a sweep, select the sub-folder of the configuration.
+point_file = 'Monte_Carlo_output/_point_precision.txt'
+
+# Layout of the point file: number of header lines to skip, column delimiter (None = spaces or tabs) and
+# column indices (starting from 0) of the coordinates and of the precisions.
+header_lines = 0
+delimiter = None
+col_x = 0
+col_y = 1
+col_sx = 3
+col_sy = 4
+col_sz = 5
+
+# Set to True if the local origin ('_coordinate_local_origin.txt') was subtracted from the point coordinates,
+# which is the case of the files written by AMP210_precision_estimates.py.
+points_are_offset = True
+
+# Cell size of the precision maps, in the units of the coordinate system (e.g. metres).
+cell_size = 1.0
+
+# Origin of the grid [X, Y]: the cell edges are aligned on this point. Use the upper-left corner of your DEM to align
+# the precision maps with it.
+# [RECOMMENDED] - Leave as NaN to use the local origin of the precision estimates.
+grid_origin = [NaN, NaN]
+
+# Gap filling by inverse distance weighting. Empty cells are filled using the cells with points located within
+# fill_radius cells, if there are at least fill_min_cells of them. Set fill_radius to 0 to disable the gap filling.
+fill_radius = 0
+fill_min_cells = 3
+
+# Size of the processing tiles (in cells) and maximum number of points kept in memory before writing them to the
+# temporary tile files. Decrease these values if the memory of your computer is limited.
+# Note that fill_radius cannot be larger than tile_size.
+tile_size = 512
+buffer_points = 1000000
+
+# Output: prefix of the raster files (written in dir_path), format ('tif' for GeoTIFF, or 'asc' for ESRI ASCII grid)
+# and no-data value. The ESRI ASCII grid format is used if GDAL is not available.
+output_prefix = 'precision_map'
+output_format = 'tif'
+nodata = -9999
+
+###################################   END OF SETUP   ###################################
+########################################################################################
+
+# Initialisation
+if cell_size <= 0:
+	raise ValueError('cell_size must be strictly positive')
+if fill_radius > tile_size:
+	raise ValueError('fill_radius cannot be larger than tile_size')
+if output_format not in ['asc', 'tif']:
+	raise ValueError('Unknown output format: ' + output_format)
+if output_format == 'tif' and gdal is None:
+	print('GDAL (osgeo) is not available: the precision maps are written as ESRI ASCII grids (.asc)')
+	output_format = 'asc'
+
+# Read the local origin of the precision estimates
+pts_offset = [0.0, 0.0, 0.0]
+if points_are_offset or math.isnan(grid_origin[0]):
+	with open(dir_path + '_coordinate_local_origin.txt', "r") as f:
+		freader = csv.reader(f, dialect='excel-tab')
+		pts_offset = [float(val) for val in next(freader)[0:3]]
+		f.close()
+if not points_are_offset:
+	offset_x, offset_y = 0.0, 0.0
+else:
+	offset_x, offset_y = pts_offset[0], pts_offset[1]
+if math.isnan(grid_origin[0]):
+	grid_origin = [pts_offset[0], pts_offset[1]]
+
+# Read the coordinate system of the chunk (WKT), if available
+crs_wkt = None
+if os.path.isfile(dir_path + '_coordinate_system.wkt'):
+	with open(dir_path + '_coordinate_system.wkt', "r") as f:
+		crs_wkt = f.read().strip()
+		f.close()
+else:
+	print('No _coordinate_system.wkt file found: the precision maps will be written without projection (.prj)')
+
+tmp_path = tempfile.mkdtemp(prefix='precision_maps_', dir=dir_path) + '/'
+layers = ['sigmaZ', 'sigmaXY', 'count']
+ncells = tile_size * tile_size
+
+# Temporary file names of the points and of the aggregated cells of a tile
+def tile_file(kind, tile_row, tile_col):
+	return tmp_path + kind + '_' + str(tile_row) + '_' + str(tile_col) + '.bin'
+
+def load_tile(tile_row, tile_col):
+	return np.fromfile(tile_file('agg', tile_row, tile_col), dtype=np.float32).reshape(3, tile_size, tile_size)
+
+# Offsets and weights of the neighbouring cells used for the gap filling
+fill_offsets = []
+for di in range(-fill_radius, fill_radius+1):
+	for dj in range(-fill_radius, fill_radius+1):
+		dist2 = di*di + dj*dj
+		if 0 < dist2 <= fill_radius*fill_radius:
+			fill_offsets.append( (di, dj, 1.0 / dist2) )
+
+# Fill the empty cells of a tile by inverse distance weighting of the cells with points (the filled cells keep a count of 0)
+def fill_tile(tile_row, tile_col, agg):
+	# Window made of the tile and of the cells of the neighbouring tiles located within fill_radius
+	width = tile_size + 2 * fill_radius
+	win = np.full((2, width, width), nodata, dtype=np.float32)
+	for dr in [-1, 0, 1]:
+		for dc in [-1, 0, 1]:
+			if (tile_row + dr, tile_col + dc) not in populated_tiles:
+				continue
+			neighbour = agg if (dr == 0 and dc == 0) else load_tile(tile_row + dr, tile_col + dc)
+			i0, i1 = max(0, fill_radius + dr * tile_size), min(width, fill_radius + (dr + 1) * tile_size)
+			j0, j1 = max(0, fill_radius + dc * tile_size), min(width, fill_radius + (dc + 1) * tile_size)
+			win[:, i0:i1, j0:j1] = neighbour[0:2, i0 - fill_radius - dr * tile_size : i1 - fill_radius - dr * tile_size,
+				j0 - fill_radius - dc * tile_size : j1 - fill_radius - dc * tile_size]
+
+	empty = agg[2] == 0
+	if not empty.any():
+		return agg
+	valid = win[0] != nodata
+	win_z = np.where(valid, win[0], 0).astype(np.float64)
+	win_xy = np.where(valid, win[1], 0).astype(np.float64)
+	sum_w = np.zeros((tile_size, tile_size))
+	sum_z = np.zeros((tile_size, tile_size))
+	sum_xy = np.zeros((tile_size, tile_size))
+	nused = np.zeros((tile_size, tile_size), dtype=np.int32)
+	for di, dj, weight in fill_offsets:
+		rows = slice(fill_radius + di, fill_radius + di + tile_size)
+		cols = slice(fill_radius + dj, fill_radius + dj + tile_size)
+		sum_w += weight * valid[rows, cols]
+		sum_z += weight * win_z[rows, cols]
+		sum_xy += weight * win_xy[rows, cols]
+		nused += valid[rows, cols]
+	filled = empty & (nused >= fill_min_cells)
+	agg[0][filled] = sum_z[filled] / sum_w[filled]
+	agg[1][filled] = sum_xy[filled] / sum_w[filled]
+	return agg
+
+out_files = {}
+out_datasets = {}
+try:
+	########################################################################################
+	# Step 1: distribute the points into tile files [global column, global row, sigma XY, sigma Z]
+	print('Reading ' + dir_path + point_file)
+	populated_tiles = set()
+	npoints = 0
+	nskipped = 0
+	min_col = min_row = max_col = max_row = None
+
+	with open(dir_path + point_file, "r") as f:
+		for line in itertools.islice(f, header_lines):
+			pass
+		while True:
+			# Read the points by blocks of buffer_points lines to keep the memory bounded
+			lines = list(itertools.islice(f, buffer_points))
+			if not lines:
+				break
+			data = np.loadtxt(lines, delimiter=delimiter, usecols=(col_x, col_y, col_sx, col_sy, col_sz), ndmin=2)
+			if data.size == 0:
+				continue
+			finite = np.isfinite(data).all(axis=1)
+			nskipped += int(data.shape[0] - finite.sum())
+			data = data[finite]
+			if data.size == 0:
+				continue
+
+			# Rows are counted downwards from the grid origin, as in the output rasters
+			cols = np.floor((data[:, 0] + offset_x - grid_origin[0]) / cell_size).astype(np.int64)
+			rows = np.floor((grid_origin[1] - data[:, 1] - offset_y) / cell_size).astype(np.int64)
+			records = np.column_stack( (cols, rows, np.sqrt(data[:, 2]**2 + data[:, 3]**2), data[:, 4]) )
+			npoints += data.shape[0]
+			if min_col is None:
+				min_col, max_col, min_row, max_row = int(cols.min()), int(cols.max()), int(rows.min()), int(rows.max())
+			else:
+				min_col, max_col = min(min_col, int(cols.min())), max(max_col, int(cols.max()))
+				min_row, max_row = min(min_row, int(rows.min())), max(max_row, int(rows.max()))
+
+			# Append the points of the block to the files of their tiles
+			keys, inverse = np.unique(np.column_stack( (rows // tile_size, cols // tile_size) ), axis=0, return_inverse=True)
+			inverse = inverse.ravel()
+			order = np.argsort(inverse, kind='stable')
+			bounds = np.concatenate( ([0], np.cumsum(np.bincount(inverse, minlength=len(keys)))) )
+			for keyIDx, key in enumerate(keys):
+				with open(tile_file('pts', key[0], key[1]), "ab") as ftile:
+					records[order[bounds[keyIDx]:bounds[keyIDx+1]]].tofile(ftile)
+					ftile.close()
+				populated_tiles.add( (int(key[0]), int(key[1])) )
+		f.close()
+
+	if nskipped > 0:
+		print(str(nskipped) + ' points skipped because of non-finite coordinates or precisions')
+	if npoints == 0:
+		raise ValueError('No valid points read from ' + dir_path + point_file)
+
+	ncols = max_col - min_col + 1
+	nrows = max_row - min_row + 1
+	print(str(npoints) + ' points read; grid of ' + str(ncols) + ' x ' + str(nrows) + ' cells')
+
+	########################################################################################
+	# Step 2: aggregate the points of each tile per cell [mean sigma Z, mean sigma XY, count]
+	for tile_row, tile_col in populated_tiles:
+		sums_z = np.zeros(ncells)
+		sums_xy = np.zeros(ncells)
+		counts = np.zeros(ncells)
+		with open(tile_file('pts', tile_row, tile_col), "rb") as f:
+			while True:
+				block = np.fromfile(f, dtype=np.float64, count=4 * buffer_points).reshape(-1, 4)
+				if block.size == 0:
+					break
+				cells = (block[:, 1].astype(np.int64) - tile_row * tile_size) * tile_size + (block[:, 0].astype(np.int64) - tile_col * tile_size)
+				sums_xy += np.bincount(cells, weights=block[:, 2], minlength=ncells)
+				sums_z += np.bincount(cells, weights=block[:, 3], minlength=ncells)
+				counts += np.bincount(cells, minlength=ncells)
+			f.close()
+		os.remove(tile_file('pts', tile_row, tile_col))
+
+		agg = np.full((3, ncells), nodata, dtype=np.float32)
+		has_points = counts > 0
+		agg[0][has_points] = sums_z[has_points] / counts[has_points]
+		agg[1][has_points] = sums_xy[has_points] / counts[has_points]
+		agg[2] = counts
+		agg.tofile(tile_file('agg', tile_row, tile_col))
+
+	########################################################################################
+	# Step 3: fill the gaps of each tile and write it to the rasters, one row of tiles at a time
+	# The grid origin is the upper-left corner of the cell (0, 0)
+	x_min = grid_origin[0] + min_col * cell_size
+	y_max = grid_origin[1] - min_row * cell_size
+	if output_format == 'tif':
+		driver = gdal.GetDriverByName('GTiff')
+		for layer in layers:
+			# Blocks that are never written (tiles without points) are read as no-data (or 0 for the count)
+			out_datasets[layer] = driver.Create(dir_path + output_prefix + '_' + layer + '.tif', ncols, nrows, 1,
+				gdal.GDT_Int32 if layer == 'count' else gdal.GDT_Float32,
+				options=['TILED=YES', 'COMPRESS=DEFLATE', 'BIGTIFF=IF_SAFER', 'SPARSE_OK=TRUE'])
+			out_datasets[layer].SetGeoTransform( [x_min, cell_size, 0, y_max, 0, -cell_size] )
+			if crs_wkt:
+				out_datasets[layer].SetProjection(crs_wkt)
+			if layer != 'count':
+				out_datasets[layer].GetRasterBand(1).SetNoDataValue(nodata)
+	else:
+		for layer in layers:
+			out_files[layer] = open(dir_path + output_prefix + '_' + layer + '.asc', "w")
+			out_files[layer].write('ncols ' + str(ncols) + '\n' + 'nrows ' + str(nrows) + '\n' +
+				'xllcorner ' + repr(x_min) + '\n' + 'yllcorner ' + repr(y_max - nrows * cell_size) + '\n' +
+				'cellsize ' + repr(cell_size) + '\n' + 'NODATA_value ' + str(nodata) + '\n')
+
+	for tile_row in range(min_row // tile_size, max_row // tile_size + 1):
+		print('Processing row of tiles ' + str(tile_row - min_row // tile_size + 1) + '/' + str(max_row // tile_size - min_row // tile_size + 1))
+		i0 = max(min_row - tile_row * tile_size, 0)
+		i1 = min(max_row - tile_row * tile_size + 1, tile_size)
+		yoff = tile_row * tile_size + i0 - min_row
+
+		# Without GDAL, the tiles are gathered in a band file to be written row by row
+		if output_format == 'asc':
+			band = np.memmap(tmp_path + 'band.bin', dtype=np.float32, mode='w+', shape=(3, i1 - i0, ncols))
+			band[0:2] = nodata
+			band[2] = 0
+
+		for tile_col in range(min_col // tile_size, max_col // tile_size + 1):
+			if (tile_row, tile_col) in populated_tiles:
+				agg = load_tile(tile_row, tile_col)
+			elif fill_radius > 0 and any([(tile_row + dr, tile_col + dc) in populated_tiles for dr in [-1, 0, 1] for dc in [-1, 0, 1]]):
+				agg = np.full((3, tile_size, tile_size), nodata, dtype=np.float32)
+				agg[2] = 0
+			else:
+				continue
+			if fill_radius > 0:
+				agg = fill_tile(tile_row, tile_col, agg)
+
+			j0 = max(min_col - tile_col * tile_size, 0)
+			j1 = min(max_col - tile_col * tile_size + 1, tile_size)
+			xoff = tile_col * tile_size + j0 - min_col
+			for layerIDx, layer in enumerate(layers):
+				values = agg[layerIDx, i0:i1, j0:j1]
+				if output_format == 'tif':
+					out_datasets[layer].GetRasterBand(1).WriteArray(values.astype(np.int32) if layer == 'count' else values, xoff, yoff)
+				else:
+					band[layerIDx, :, xoff : xoff + j1 - j0] = values
+
+		if output_format == 'asc':
+			for layerIDx, layer in enumerate(layers):
+				for i in range(0, i1 - i0):
+					np.savetxt(out_files[layer], band[layerIDx, i:i+1, :], fmt='%d' if layer == 'count' else '%.5f')
+			del band
+			os.remove(tmp_path + 'band.bin')
+
+	for layer in layers:
+		if output_format == 'asc' and crs_wkt:
+			with open(dir_path + output_prefix + '_' + layer + '.prj', "w") as f:
+				f.write(crs_wkt)
+				f.close()
+
+finally:
+	# Close the rasters and remove the temporary files, also if the processing failed or was interrupted
+	for layer in out_files:
+		out_files[layer].close()
+	for layer in list(out_datasets):
+		out_datasets[layer].FlushCache()
+		out_datasets[layer] = None
+	out_datasets.clear()
+	shutil.rmtree(tmp_path, ignore_errors=True)
+
+print('Precision maps written to ' + dir_path + output_prefix + '_*')
+
+#-------------------------------------------------------------------------------
+#     END OF CODE